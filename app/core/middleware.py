@@ -0,0 +1,217 @@
+"""
+Pure-ASGI middleware used by the main application
+"""
+import asyncio
+from typing import Dict, Iterable, Tuple
+
+ALLOW_METHODS = b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"
+PREFLIGHT_MAX_AGE = b"600"
+
+class FastCORS:
+    """CORS with credentials and all methods/headers allowed for a fixed set of origins"""
+    
+    def __init__(self, app, allow_origins: Iterable[str] = ("*",)):
+        self.app = app
+        
+        # Origins are compared as raw header bytes; "*" allows any origin
+        origins = frozenset(origin.encode("latin-1") for origin in allow_origins)
+        self.allow_all_origins = b"*" in origins
+        self.allow_origins = origins - {b"*"}
+        
+        # Header tuples are built once; the hot path only extends a list
+        self.simple_headers = [
+            (b"access-control-allow-origin", b"*"),
+            (b"access-control-allow-credentials", b"true"),
+        ]
+        self.preflight_headers = [
+            (b"access-control-allow-methods", ALLOW_METHODS),
+            (b"access-control-allow-credentials", b"true"),
+            (b"access-control-max-age", PREFLIGHT_MAX_AGE),
+            (b"vary", b"Origin"),
+        ]
+    
+    def is_allowed_origin(self, origin: bytes) -> bool:
+        """Check an Origin header value against the allowlist"""
+        return self.allow_all_origins or origin in self.allow_origins
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        origin = None
+        request_method = None
+        request_headers = None
+        has_cookie = False
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+            elif name == b"cookie":
+                has_cookie = True
+        
+        # Not a cross-origin request
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+        
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            await self.preflight(origin, request_headers, send)
+            return
+        
+        if not self.is_allowed_origin(origin):
+            # The browser blocks the response without CORS headers
+            await self.app(scope, receive, send)
+            return
+        
+        # Credentialed requests and allowlisted origins must see their own origin
+        if has_cookie or not self.allow_all_origins:
+            cors_headers = [
+                (b"access-control-allow-origin", origin),
+                (b"access-control-allow-credentials", b"true"),
+                (b"vary", b"Origin"),
+            ]
+        else:
+            cors_headers = self.simple_headers
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + cors_headers
+            await send(message)
+        
+        await self.app(scope, receive, send_wrapper)
+    
+    async def preflight(self, origin: bytes, request_headers, send):
+        """Answer a preflight request without reaching the application"""
+        if not self.is_allowed_origin(origin):
+            body = b"Disallowed CORS origin"
+            await send({
+                "type": "http.response.start",
+                "status": 400,
+                "headers": [
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode("ascii")),
+                    (b"vary", b"Origin"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        
+        headers = [(b"access-control-allow-origin", origin)] + self.preflight_headers
+        if request_headers:
+            headers.append((b"access-control-allow-headers", request_headers))
+        
+        await send({"type": "http.response.start", "status": 204, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
+
+class ScopedMiddleware:
+    """Run a wrapped middleware for every path except the given prefixes"""
+    
+    def __init__(self, app, inner, bypass_prefixes: Tuple[str, ...], **options):
+        self.app = app
+        self.inner = inner(app, **options)
+        self.bypass_prefixes = bypass_prefixes
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.bypass_prefixes):
+            await self.app(scope, receive, send)
+            return
+        
+        await self.inner(scope, receive, send)
+
+class ScopedRiskMitigation(ScopedMiddleware):
+    """Run a wrapped middleware only for paths that can carry client content"""
+    
+    # Probes, static assets and API docs never need risk mitigation
+    BYPASS_PREFIXES = ("/health", "/static", "/admin/static", "/openapi", "/docs", "/redoc")
+    
+    def __init__(self, app, inner):
+        super().__init__(app, inner, self.BYPASS_PREFIXES)
+
+class FastPathMount:
+    """Dispatch a path prefix straight to another ASGI app, ahead of the middleware added before it"""
+    
+    def __init__(self, app, prefix: str, target):
+        self.app = app
+        self.prefix = prefix
+        self.target = target
+    
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] == "http" and (path == self.prefix or path.startswith(self.prefix + "/")):
+            # Same scope layout Starlette's Mount hands to a mounted app
+            child_scope = dict(scope)
+            child_scope["root_path"] = scope.get("root_path", "") + self.prefix
+            child_scope["path"] = path[len(self.prefix):] or "/"
+            await self.target(child_scope, receive, send)
+            return
+        
+        await self.app(scope, receive, send)
+
+class ReadinessGate:
+    """
+    Hold requests under the given path prefixes until an app.state event is set,
+    answering 503 if it is still unset after timeout seconds
+    """
+    
+    def __init__(self, app, event: str, prefixes: Tuple[str, ...], exclude_prefixes: Tuple[str, ...] = (),
+                 timeout: float = 30.0):
+        self.app = app
+        self.event = event
+        self.prefixes = prefixes
+        self.exclude_prefixes = exclude_prefixes
+        self.timeout = timeout
+    
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if (scope["type"] == "http" and path.startswith(self.prefixes)
+                and not path.startswith(self.exclude_prefixes)):
+            # The event is created during lifespan startup; no event means no gate
+            ready = getattr(scope["app"].state, self.event, None)
+            if ready is not None and not ready.is_set():
+                try:
+                    await asyncio.wait_for(ready.wait(), self.timeout)
+                except asyncio.TimeoutError:
+                    await self.unavailable(send)
+                    return
+        
+        await self.app(scope, receive, send)
+    
+    @staticmethod
+    async def unavailable(send):
+        """Answer 503 for a request whose dependency never became ready"""
+        body = b"Service Unavailable"
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode("ascii")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+class StaticRedirects:
+    """Answer fixed permanent GET/HEAD redirects before any other middleware or routing"""
+    
+    def __init__(self, app, redirects: Dict[str, str]):
+        self.app = app
+        self.redirects = {path: target.encode("latin-1") for path, target in redirects.items()}
+    
+    async def __call__(self, scope, receive, send):
+        # Other methods are passed through to the app unchanged
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            location = self.redirects.get(scope["path"])
+            if location is not None:
+                await send({
+                    "type": "http.response.start",
+                    "status": 308,
+                    "headers": [(b"location", location), (b"content-length", b"0")],
+                })
+                await send({"type": "http.response.body", "body": b""})
+                return
+        
+        await self.app(scope, receive, send)
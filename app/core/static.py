@@ -0,0 +1,85 @@
+"""
+Static file serving from an in-memory index built at startup
+"""
+import hashlib
+import mimetypes
+import os
+from typing import Dict, List, Optional, Tuple
+
+class PreloadedStaticFiles:
+    """ASGI app serving every file under a directory from memory, with ETag revalidation"""
+    
+    def __init__(self, directory: str, cache_control: Optional[str] = None):
+        if not os.path.isdir(directory):
+            raise RuntimeError(f"Directory '{directory}' does not exist")
+        
+        self.directory = directory
+        # Sent on 200 and 304 responses alike so caches keep honouring it
+        self.cache_headers = [(b"cache-control", cache_control.encode("latin-1"))] if cache_control else []
+        # URL path -> (body, response headers, quoted etag)
+        self.files: Dict[str, Tuple[bytes, List[Tuple[bytes, bytes]], bytes]] = {}
+        
+        for root, _, names in os.walk(directory):
+            for name in names:
+                file_path = os.path.join(root, name)
+                with open(file_path, "rb") as f:
+                    body = f.read()
+                
+                url_path = "/" + os.path.relpath(file_path, directory).replace(os.sep, "/")
+                content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                if content_type.startswith("text/") or content_type == "application/javascript":
+                    content_type += "; charset=utf-8"
+                etag = b'"' + hashlib.blake2b(body, digest_size=8).hexdigest().encode("ascii") + b'"'
+                
+                self.files[url_path] = (body, [
+                    (b"content-type", content_type.encode("latin-1")),
+                    (b"content-length", str(len(body)).encode("ascii")),
+                    (b"etag", etag),
+                ] + self.cache_headers, etag)
+    
+    async def __call__(self, scope, receive, send):
+        assert scope["type"] == "http"
+        
+        if scope["method"] not in ("GET", "HEAD"):
+            await self._send_plain(send, 405, b"Method Not Allowed")
+            return
+        
+        # Depending on the Starlette version, the mount prefix is either already
+        # stripped from the path or only recorded in root_path
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path + "/"):
+            path = path[len(root_path):]
+        
+        entry = self.files.get(path)
+        if entry is None:
+            await self._send_plain(send, 404, b"Not Found")
+            return
+        
+        body, headers, etag = entry
+        for name, value in scope["headers"]:
+            if name == b"if-none-match":
+                tags = [tag.strip() for tag in value.split(b",")]
+                if etag in tags or b"W/" + etag in tags or b"*" in tags:
+                    await send({"type": "http.response.start", "status": 304,
+                                "headers": [(b"etag", etag)] + self.cache_headers})
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+                break
+        
+        # Send a copy; wrapping middleware (e.g. GZip) may edit the header list in place
+        await send({"type": "http.response.start", "status": 200, "headers": list(headers)})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+    
+    @staticmethod
+    async def _send_plain(send, status: int, body: bytes):
+        """Send a short plain-text error response"""
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode("ascii")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
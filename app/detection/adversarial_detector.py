@@ -2,19 +2,59 @@
 Adversarial input detection module for identifying malicious or crafted inputs
 """
 import re
+import copy
+import hashlib
 import math
+import threading
 from typing import Dict, List, Any, Optional
 import structlog
-from collections import Counter
+from collections import Counter, OrderedDict
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
 
 logger = structlog.get_logger(__name__)
 
 class AdversarialDetector:
     """Detects adversarial inputs designed to manipulate AI systems"""
     
-    def __init__(self, threshold: float = 0.2):  # Much lower threshold for better detection
+    # Below this many distinct characters the scalar entropy loop beats NumPy setup cost
+    VECTORIZED_ENTROPY_MIN_SYMBOLS = 64
+    
+    # Inputs longer than CHUNK_THRESHOLD are regex-scanned in overlapping windows,
+    # bounding backtracking to one window. CHUNK_OVERLAP must exceed the longest
+    # expected single match.
+    CHUNK_THRESHOLD = 16_384
+    CHUNK_SIZE = 8_192
+    CHUNK_OVERLAP = 256
+    
+    # Contribution of each detection category to the overall score, listed in the
+    # order detect_adversarial_input runs them (descending weight)
+    DETECTION_WEIGHTS = {
+        "prompt_injection": 0.25,
+        "jailbreak": 0.25,
+        "obfuscation": 0.15,
+        "social_engineering": 0.15,
+        "encoding_attacks": 0.1,
+        "statistical_anomalies": 0.1
+    }
+    
+    def __init__(self, threshold: float = 0.2,  # Much lower threshold for better detection
+                 cache_size: int = 1024):
         self.threshold = threshold
         
+        # Results for recently seen texts; detection is a pure function of
+        # (text, threshold, fast_mode), so repeats can skip every detector
+        self.cache_size = cache_size
+        self._result_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
+        # (category, weight) pairs resolved once, in detector order
+        self._weighted_categories = tuple(self.DETECTION_WEIGHTS.items())
+        
         # Prompt injection patterns
         self.injection_patterns = [
             r"ignore\s+(?:previous|all|the)\s+(?:instructions|prompts|rules)",
@@ -63,56 +103,179 @@ class AdversarialDetector:
             r"%[0-9a-fA-F]{2}",    # URL encoding
             r"[A-Za-z0-9+/]{20,}={0,2}",  # Base64-like
         ]
+        
+        # Role-playing scenarios designed to bypass restrictions
+        self.roleplay_patterns = [
+            r"in\s+this\s+hypothetical",
+            r"imagine\s+you\s+are",
+            r"pretend\s+we\s+are",
+            r"for\s+educational\s+purposes"
+        ]
+        
+        # Urgency indicators
+        self.urgency_patterns = [
+            r"immediately", r"right\s+now", r"asap", r"quickly",
+            r"time\s+sensitive", r"deadline", r"expires?"
+        ]
+        
+        # Authority claims
+        self.authority_patterns = [
+            r"i\s+am\s+your\s+(?:creator|developer|administrator)",
+            r"this\s+is\s+(?:official|authorized|legitimate)",
+            r"by\s+order\s+of"
+        ]
+        
+        # SQL injection patterns
+        self.sql_patterns = [
+            r"(union|select|insert|delete|drop|update)\s+",
+            r"'\s*or\s*'?1'?\s*=\s*'?1",
+            r";\s*(drop|delete|truncate)",
+        ]
+        
+        # Script injection patterns
+        self.script_patterns = [
+            r"<script[^>]{0,200}>",  # Bounded so an unclosed tag is not rescanned to the end
+            r"javascript:",
+            r"eval\s*\(",
+            r"document\.",
+        ]
+        
+        # System prompt leakage keywords
+        self.system_keywords = ["system prompt", "initial instructions", "base prompt"]
+        
+        # Compile once so the per-request detectors skip the re module cache lookup.
+        # Counted categories stay one pattern per scan: an alternation is not a
+        # single DFA pass in the re module, and it would count overlapping hits
+        # from different patterns only once
+        self._injection_res = self._compile(self.injection_patterns, re.IGNORECASE)
+        self._obfuscation_res = self._compile(self.obfuscation_patterns)
+        self._encoding_res = self._compile(self.encoding_patterns)
+        
+        # Presence-scored families: each pattern is searched on its own so the
+        # scan stops at its first hit
+        self._roleplay_res = self._compile(self.roleplay_patterns, re.IGNORECASE)
+        self._urgency_res = self._compile(self.urgency_patterns, re.IGNORECASE)
+        self._authority_res = self._compile(self.authority_patterns, re.IGNORECASE)
+        self._sql_res = self._compile(self.sql_patterns, re.IGNORECASE)
+        self._script_res = self._compile(self.script_patterns, re.IGNORECASE)
+        
+        # Literal keyword sets are lowered once and matched with substring checks
+        self._system_keywords_lower = self._lower_keywords(self.system_keywords)
+        self._jailbreak_lower = self._lower_keywords(self.jailbreak_indicators)
+        self._social_engineering_lower = self._lower_keywords(self.social_engineering_keywords)
+    
+    @staticmethod
+    def _compile(patterns: List[str], flags: int = 0) -> List[re.Pattern]:
+        """Compile a list of regex strings with the given flags"""
+        return [re.compile(pattern, flags) for pattern in patterns]
+    
+    @staticmethod
+    def _lower_keywords(keywords: List[str]) -> tuple:
+        """Lowercase a keyword list once for matching against lowered text"""
+        return tuple(keyword.lower() for keyword in keywords)
+    
+    @staticmethod
+    def _count_keywords(keywords: tuple, text_lower: str) -> int:
+        """Count how many of the lowered keywords occur in the lowered text"""
+        return sum(1 for keyword in keywords if keyword in text_lower)
+    
+    @classmethod
+    def _iter_chunks(cls, text_len: int):
+        """
+        Yield (start, end, owned_end) windows covering a text of text_len chars.
+        
+        Short texts are a single window. Longer texts are split into
+        CHUNK_SIZE windows extended by CHUNK_OVERLAP so matches crossing a
+        boundary are still seen whole; each window owns the matches that start
+        before owned_end, so none is counted twice.
+        """
+        if text_len <= cls.CHUNK_THRESHOLD:
+            yield 0, text_len, text_len
+            return
+        
+        for start in range(0, text_len, cls.CHUNK_SIZE):
+            owned_end = min(start + cls.CHUNK_SIZE, text_len)
+            yield start, min(owned_end + cls.CHUNK_OVERLAP, text_len), owned_end
+    
+    @classmethod
+    def _count_matches(cls, pattern: re.Pattern, text: str) -> int:
+        """Count matches of a pattern without materializing the match list"""
+        count = 0
+        covered_until = 0
+        for start, end, owned_end in cls._iter_chunks(len(text)):
+            for match in pattern.finditer(text, start, end):
+                if match.start() >= owned_end:
+                    break
+                # A run cut off at the previous window edge is already counted
+                if match.start() >= covered_until:
+                    count += 1
+                covered_until = max(covered_until, match.end())
+        return count
+    
+    @classmethod
+    def _is_present(cls, pattern: re.Pattern, text: str) -> bool:
+        """Check whether a pattern occurs anywhere in text, stopping at the first hit"""
+        return any(pattern.search(text, start, end) for start, end, _ in cls._iter_chunks(len(text)))
     
-    def detect_adversarial_input(self, text: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+    @classmethod
+    def _count_present(cls, patterns: List[re.Pattern], text: str) -> int:
+        """Count how many of the patterns occur in text"""
+        return sum(1 for pattern in patterns if cls._is_present(pattern, text))
+    
+    def detect_adversarial_input(self, text: str, context: Dict[str, Any] = None,
+                                 fast_mode: bool = False) -> Dict[str, Any]:
         """
         Detect adversarial inputs in text
         
         Args:
             text: Input text to analyze
             context: Additional context for detection
+            fast_mode: Stop running detectors once the weighted score already
+                exceeds the threshold. The result is still correctly flagged,
+                but severity is a lower bound and skipped categories are
+                missing from detection_scores.
             
         Returns:
             Detection result with adversarial score and details
         """
+        cache_key = None
+        if self.cache_size > 0:
+            digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+            cache_key = (digest, self.threshold, fast_mode)
+            with self._cache_lock:
+                cached = self._result_cache.get(cache_key)
+                if cached is not None:
+                    self._result_cache.move_to_end(cache_key)
+            if cached is not None:
+                return copy.deepcopy(cached)
+        
         try:
             detection_scores = {}
+            overall_score = 0.0
             
-            # 1. Prompt injection detection
-            injection_score = self._detect_prompt_injection(text)
-            detection_scores["prompt_injection"] = injection_score
-            
-            # 2. Jailbreak attempt detection
-            jailbreak_score = self._detect_jailbreak_attempts(text)
-            detection_scores["jailbreak"] = jailbreak_score
+            # Character frequencies shared by the statistical checks
+            char_freq = Counter(text)
             
-            # 3. Obfuscation detection
-            obfuscation_score = self._detect_obfuscation(text)
-            detection_scores["obfuscation"] = obfuscation_score
+            # Lowered once for the literal keyword scans
+            text_lower = text.lower()
             
-            # 4. Social engineering detection
-            social_eng_score = self._detect_social_engineering(text)
-            detection_scores["social_engineering"] = social_eng_score
+            # Same order as DETECTION_WEIGHTS so fast mode stops as early as possible
+            detectors = (
+                lambda: self._detect_prompt_injection(text, text_lower),
+                lambda: self._detect_jailbreak_attempts(text, text_lower),
+                lambda: self._detect_obfuscation(text, char_freq),
+                lambda: self._detect_social_engineering(text, text_lower),
+                lambda: self._detect_encoding_attacks(text),
+                lambda: self._detect_statistical_anomalies(text, char_freq),
+            )
             
-            # 5. Encoding/payload detection
-            encoding_score = self._detect_encoding_attacks(text)
-            detection_scores["encoding_attacks"] = encoding_score
-            
-            # 6. Statistical anomaly detection
-            anomaly_score = self._detect_statistical_anomalies(text)
-            detection_scores["statistical_anomalies"] = anomaly_score
-            
-            # Calculate weighted overall score
-            weights = {
-                "prompt_injection": 0.25,
-                "jailbreak": 0.25,
-                "obfuscation": 0.15,
-                "social_engineering": 0.15,
-                "encoding_attacks": 0.1,
-                "statistical_anomalies": 0.1
-            }
-            
-            overall_score = sum(score * weights[key] for key, score in detection_scores.items())
+            for (key, weight), detect in zip(self._weighted_categories, detectors):
+                score = detect()
+                detection_scores[key] = score
+                overall_score += score * weight
+                # Scores are non-negative, so later detectors cannot undo a detection
+                if fast_mode and overall_score > self.threshold:
+                    break
             
             # Additional risk factors
             risk_factors = self._identify_risk_factors(text, detection_scores)
@@ -129,8 +292,14 @@ class AdversarialDetector:
                 }
             }
             
-            logger.info("adversarial_detection_completed", 
-                       score=overall_score, detected=result["detected"])
+            logger.debug("adversarial_detection_completed", 
+                        score=overall_score, detected=result["detected"])
+            
+            if cache_key is not None:
+                with self._cache_lock:
+                    self._result_cache[cache_key] = copy.deepcopy(result)
+                    while len(self._result_cache) > self.cache_size:
+                        self._result_cache.popitem(last=False)
             return result
             
         except Exception as e:
@@ -143,97 +312,82 @@ class AdversarialDetector:
                 "details": {"error": str(e)}
             }
     
-    def _detect_prompt_injection(self, text: str) -> float:
+    def detect_batch(self, texts: List[str], fast_mode: bool = False) -> List[Dict[str, Any]]:
+        """
+        Detect adversarial inputs in several texts
+        
+        Args:
+            texts: Input texts to analyze
+            fast_mode: Passed through to detect_adversarial_input
+            
+        Returns:
+            Detection results in the same order as texts
+        """
+        # Matching holds the GIL, so a thread pool would only add overhead;
+        # repeated texts within a batch are served from the result cache
+        detect = self.detect_adversarial_input
+        return [detect(text, fast_mode=fast_mode) for text in texts]
+    
+    def _detect_prompt_injection(self, text: str, text_lower: str) -> float:
         """Detect prompt injection attempts"""
-        text_lower = text.lower()
         injection_score = 0.0
         
-        for pattern in self.injection_patterns:
-            matches = re.findall(pattern, text_lower, re.IGNORECASE)
-            if matches:
-                injection_score += 0.3 * len(matches)
+        for pattern in self._injection_res:
+            match_count = self._count_matches(pattern, text)
+            if match_count:
+                injection_score += 0.3 * match_count
         
         # Check for system prompt leakage attempts
-        system_keywords = ["system prompt", "initial instructions", "base prompt"]
-        for keyword in system_keywords:
-            if keyword in text_lower:
-                injection_score += 0.4
+        injection_score += 0.4 * self._count_keywords(self._system_keywords_lower, text_lower)
         
         return min(injection_score, 1.0)
     
-    def _detect_jailbreak_attempts(self, text: str) -> float:
+    def _detect_jailbreak_attempts(self, text: str, text_lower: str) -> float:
         """Detect jailbreak attempts"""
-        text_lower = text.lower()
         jailbreak_score = 0.0
         
-        for indicator in self.jailbreak_indicators:
-            if indicator.lower() in text_lower:
-                jailbreak_score += 0.3
+        jailbreak_score += 0.3 * self._count_keywords(self._jailbreak_lower, text_lower)
         
         # Check for role-playing scenarios designed to bypass restrictions
-        roleplay_patterns = [
-            r"in\s+this\s+hypothetical",
-            r"imagine\s+you\s+are",
-            r"pretend\s+we\s+are",
-            r"for\s+educational\s+purposes"
-        ]
-        
-        for pattern in roleplay_patterns:
-            if re.search(pattern, text_lower):
-                jailbreak_score += 0.2
+        jailbreak_score += 0.2 * self._count_present(self._roleplay_res, text)
         
         return min(jailbreak_score, 1.0)
     
-    def _detect_obfuscation(self, text: str) -> float:
+    def _detect_obfuscation(self, text: str, char_freq: Counter) -> float:
         """Detect text obfuscation techniques"""
         obfuscation_score = 0.0
         
-        for pattern in self.obfuscation_patterns:
-            matches = re.findall(pattern, text)
-            if matches:
-                obfuscation_score += 0.2 * len(matches)
+        for pattern in self._obfuscation_res:
+            match_count = self._count_matches(pattern, text)
+            if match_count:
+                obfuscation_score += 0.2 * match_count
         
         # Check for mixed language/script obfuscation
-        non_ascii_count = sum(1 for char in text if ord(char) > 127)
+        # str.isascii() reads a flag CPython keeps on the string, so ASCII input skips the count
+        non_ascii_count = 0 if text.isascii() else sum(
+            count for char, count in char_freq.items() if ord(char) > 127)
         if non_ascii_count > len(text) * 0.1:  # >10% non-ASCII
             obfuscation_score += 0.3
         
         # Check for excessive punctuation/symbols
-        symbol_count = sum(1 for char in text if not char.isalnum() and not char.isspace())
+        symbol_count = sum(count for char, count in char_freq.items()
+                           if not char.isalnum() and not char.isspace())
         if symbol_count > len(text) * 0.2:  # >20% symbols
             obfuscation_score += 0.2
         
         return min(obfuscation_score, 1.0)
     
-    def _detect_social_engineering(self, text: str) -> float:
+    def _detect_social_engineering(self, text: str, text_lower: str) -> float:
         """Detect social engineering attempts"""
-        text_lower = text.lower()
         social_eng_score = 0.0
         
-        for keyword in self.social_engineering_keywords:
-            if keyword in text_lower:
-                social_eng_score += 0.15
+        social_eng_score += 0.15 * self._count_keywords(self._social_engineering_lower, text_lower)
         
         # Check for urgency indicators
-        urgency_patterns = [
-            r"immediately", r"right\s+now", r"asap", r"quickly",
-            r"time\s+sensitive", r"deadline", r"expires?"
-        ]
-        
-        for pattern in urgency_patterns:
-            if re.search(pattern, text_lower):
-                social_eng_score += 0.1
+        social_eng_score += 0.1 * self._count_present(self._urgency_res, text)
         
         # Check for authority claims
-        authority_patterns = [
-            r"i\s+am\s+your\s+(?:creator|developer|administrator)",
-            r"this\s+is\s+(?:official|authorized|legitimate)",
-            r"by\s+order\s+of"
-        ]
-        
-        for pattern in authority_patterns:
-            if re.search(pattern, text_lower):
-                social_eng_score += 0.3
+        social_eng_score += 0.3 * self._count_present(self._authority_res, text)
         
         return min(social_eng_score, 1.0)
     
@@ -241,57 +395,42 @@ class AdversarialDetector:
         """Detect encoded payloads or injection attempts"""
         encoding_score = 0.0
         
-        for pattern in self.encoding_patterns:
-            matches = re.findall(pattern, text)
-            if matches:
-                encoding_score += 0.2 * len(matches)
+        for pattern in self._encoding_res:
+            match_count = self._count_matches(pattern, text)
+            if match_count:
+                encoding_score += 0.2 * match_count
         
         # Check for SQL injection patterns
-        sql_patterns = [
-            r"(union|select|insert|delete|drop|update)\s+",
-            r"'\s*or\s*'?1'?\s*=\s*'?1",
-            r";\s*(drop|delete|truncate)",
-        ]
-        
-        for pattern in sql_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                encoding_score += 0.4
+        encoding_score += 0.4 * self._count_present(self._sql_res, text)
         
         # Check for script injection
-        script_patterns = [
-            r"<script[^>]*>",
-            r"javascript:",
-            r"eval\s*\(",
-            r"document\.",
-        ]
-        
-        for pattern in script_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                encoding_score += 0.3
+        encoding_score += 0.3 * self._count_present(self._script_res, text)
         
         return min(encoding_score, 1.0)
     
-    def _detect_statistical_anomalies(self, text: str) -> float:
+    def _detect_statistical_anomalies(self, text: str, char_freq: Counter) -> float:
         """Detect statistical anomalies in text"""
         if len(text) < 10:
             return 0.0
         
         anomaly_score = 0.0
         
-        # Character frequency analysis
-        char_freq = Counter(text.lower())
+        # Case-folded character frequencies, derived from the shared counter
+        folded_freq = Counter()
+        for char, count in char_freq.items():
+            folded_freq[char.lower()] += count
         
         # Check for unusual character distributions
-        if len(char_freq) < len(text) * 0.1:  # Very low character diversity
+        if len(folded_freq) < len(text) * 0.1:  # Very low character diversity
             anomaly_score += 0.3
         
         # Check for excessive repetition
-        most_common_char = char_freq.most_common(1)[0]
-        if most_common_char[1] > len(text) * 0.5:  # One character >50%
+        max_count = max(folded_freq.values())
+        if max_count > len(text) * 0.5:  # One character >50%
             anomaly_score += 0.4
         
         # Check entropy
-        entropy = self._calculate_entropy(text)
+        entropy = self._calculate_entropy(char_freq, len(text))
         if entropy < 2.0:  # Very low entropy
             anomaly_score += 0.3
         elif entropy > 7.0:  # Very high entropy (random-like)
@@ -299,13 +438,15 @@ class AdversarialDetector:
         
         return min(anomaly_score, 1.0)
     
-    def _calculate_entropy(self, text: str) -> float:
-        """Calculate Shannon entropy of text"""
-        if not text:
+    def _calculate_entropy(self, char_freq: Counter, text_len: int) -> float:
+        """Calculate Shannon entropy of text from its character frequencies"""
+        if not text_len:
             return 0
         
-        char_freq = Counter(text)
-        text_len = len(text)
+        if NUMPY_AVAILABLE and len(char_freq) >= self.VECTORIZED_ENTROPY_MIN_SYMBOLS:
+            counts = np.fromiter(char_freq.values(), dtype=np.float64, count=len(char_freq))
+            probabilities = counts / text_len
+            return float(-(probabilities * np.log2(probabilities)).sum())
         
         entropy = 0
         for count in char_freq.values():
@@ -318,19 +459,19 @@ class AdversarialDetector:
         """Identify specific risk factors"""
         risk_factors = []
         
-        if scores["prompt_injection"] > 0.3:
+        if scores.get("prompt_injection", 0.0) > 0.3:
             risk_factors.append("Potential prompt injection detected")
         
-        if scores["jailbreak"] > 0.3:
+        if scores.get("jailbreak", 0.0) > 0.3:
             risk_factors.append("Jailbreak attempt indicators found")
         
-        if scores["obfuscation"] > 0.4:
+        if scores.get("obfuscation", 0.0) > 0.4:
             risk_factors.append("Text obfuscation techniques detected")
         
-        if scores["social_engineering"] > 0.3:
+        if scores.get("social_engineering", 0.0) > 0.3:
             risk_factors.append("Social engineering patterns identified")
         
-        if scores["encoding_attacks"] > 0.2:
+        if scores.get("encoding_attacks", 0.0) > 0.2:
             risk_factors.append("Encoded payloads or injection attempts")
         
         if len(text) > 5000:
@@ -368,3 +509,9 @@ class AdversarialDetector:
             analysis.append(f"Risk factors: {'; '.join(risk_factors)}")
         
         return "; ".join(analysis)
+
+
+# Shared instance with the default threshold. Building a detector compiles every
+# pattern, so request handlers should import this instead of constructing
+# their own: from app.detection.adversarial_detector import default_detector
+default_detector = AdversarialDetector()
@@ -2,14 +2,22 @@
 Ollama Client for LLM integration
 """
 import requests
+import httpx
+import hashlib
 import json
-from typing import Dict, List, Optional, Any
+import orjson
+import time
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple
 import structlog
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime
 
 logger = structlog.get_logger(__name__)
 
+JSON_HEADERS = {"Content-Type": "application/json"}
+
 @dataclass
 class LLMResponse:
     """Response from LLM"""
@@ -28,16 +36,46 @@ class OllamaClient:
     def __init__(self, 
                  base_url: str = "http://localhost:11434",
                  model: str = "llama3.1",
-                 timeout: int = 120):
+                 timeout: int = 120,
+                 cache_size: int = 512,
+                 cache_ttl: float = 300.0):
         self.base_url = base_url
         self.model = model
         self.timeout = timeout
         self.logger = logger.bind(component="ollama_client")
         
+        # LRU of generated responses: key -> (expiry on the monotonic clock, response)
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache: "OrderedDict[bytes, Tuple[float, LLMResponse]]" = OrderedDict()
+        
+        # Pooled keep-alive connections for the synchronous /api/tags calls.
+        # No retries: health_check runs on the event loop, so one attempt
+        # must stay bounded by its own timeout
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=0)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        
+        # Non-blocking client for generation so concurrent requests overlap
+        self._aclient = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_keepalive_connections=16, max_connections=32)
+        )
+    
+    def close(self):
+        """Close pooled connections"""
+        self._session.close()
+    
+    async def aclose(self):
+        """Close the async client's pooled connections"""
+        await self._aclient.aclose()
+        
     def health_check(self) -> bool:
         """Check if Ollama is running and accessible"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = self._session.get(f"{self.base_url}/api/tags", timeout=5)
             return response.status_code == 200
         except Exception as e:
             self.logger.warning("Ollama health check failed", error=str(e))
@@ -46,7 +84,7 @@ class OllamaClient:
     def list_models(self) -> List[str]:
         """List available models"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = self._session.get(f"{self.base_url}/api/tags", timeout=5)
             if response.status_code == 200:
                 data = response.json()
                 return [model["name"] for model in data.get("models", [])]
@@ -55,14 +93,13 @@ class OllamaClient:
             self.logger.error("Failed to list models", error=str(e))
             return []
     
-    async def generate(self, 
-                      prompt: str, 
-                      system_prompt: Optional[str] = None,
-                      temperature: float = 0.7,
-                      max_tokens: Optional[int] = None,
-                      stream: bool = False) -> LLMResponse:
-        """Generate response from Ollama"""
-        
+    def _build_generate_payload(self,
+                                prompt: str,
+                                system_prompt: Optional[str],
+                                temperature: float,
+                                max_tokens: Optional[int],
+                                stream: bool) -> Dict[str, Any]:
+        """Build the /api/generate request body"""
         payload = {
             "model": self.model,
             "prompt": prompt,
@@ -78,32 +115,130 @@ class OllamaClient:
         if max_tokens:
             payload["options"]["num_predict"] = max_tokens
         
+        return payload
+    
+    @staticmethod
+    def _response_metadata(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract timing and token counts from an Ollama response body"""
+        return {
+            "total_duration": data.get("total_duration"),
+            "load_duration": data.get("load_duration"),
+            "prompt_eval_count": data.get("prompt_eval_count"),
+            "eval_count": data.get("eval_count"),
+            "eval_duration": data.get("eval_duration")
+        }
+    
+    def _cache_key(self,
+                   prompt: str,
+                   system_prompt: Optional[str],
+                   temperature: float,
+                   max_tokens: Optional[int]) -> bytes:
+        """Hash the inputs that determine a generation"""
+        key = hashlib.blake2b(digest_size=16)
+        for part in (self.model, prompt, system_prompt or "", repr(temperature), repr(max_tokens)):
+            key.update(part.encode("utf-8"))
+            key.update(b"\x00")
+        return key.digest()
+    
+    def _cache_get(self, key: bytes) -> Optional[LLMResponse]:
+        """Return a fresh copy of a cached response, or None if missing or expired"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, response = entry
+        if expires_at < time.monotonic():
+            del self._cache[key]
+            return None
+        
+        self._cache.move_to_end(key)
+        # Callers may modify the metadata they get back
+        return replace(response, timestamp=datetime.now(), metadata=dict(response.metadata))
+    
+    def _cache_put(self, key: bytes, response: LLMResponse):
+        """Store a response, evicting the least recently used entry when full"""
+        # Keep a private copy of the metadata; the caller still holds the original
+        self._cache[key] = (time.monotonic() + self.cache_ttl, replace(response, metadata=dict(response.metadata)))
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
+    async def _iter_generate_chunks(self, payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield each NDJSON chunk of a streaming /api/generate call"""
+        async with self._aclient.stream("POST", "/api/generate",
+                                       content=orjson.dumps(payload), headers=JSON_HEADERS) as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                raise Exception(f"Ollama API error: {response.status_code} - {body.decode(errors='replace')}")
+            
+            async for line in response.aiter_lines():
+                if line:
+                    yield orjson.loads(line)
+    
+    async def generate(self, 
+                      prompt: str, 
+                      system_prompt: Optional[str] = None,
+                      temperature: float = 0.7,
+                      max_tokens: Optional[int] = None,
+                      stream: bool = False,
+                      use_cache: Optional[bool] = None) -> LLMResponse:
+        """
+        Generate response from Ollama
+        
+        Responses are cached by (model, prompt, system prompt, temperature,
+        max_tokens). By default only deterministic (temperature 0) generations
+        are cached; pass use_cache to force caching on or off.
+        """
+        if use_cache is None:
+            use_cache = temperature == 0
+        
+        cache_key = None
+        if use_cache and self.cache_size > 0:
+            cache_key = self._cache_key(prompt, system_prompt, temperature, max_tokens)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                self.logger.debug("Serving cached response", model=self.model)
+                return cached
+        
+        payload = self._build_generate_payload(prompt, system_prompt, temperature, max_tokens, stream)
+        
         try:
             self.logger.info("Generating response", 
                            model=self.model, 
                            prompt_length=len(prompt))
             
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json=payload,
-                timeout=self.timeout
-            )
+            if stream:
+                # Assemble the streamed chunks; the final chunk carries the metadata
+                parts = []
+                data = {}
+                async for data in self._iter_generate_chunks(payload):
+                    parts.append(data.get("response", ""))
+                
+                result = LLMResponse(
+                    text="".join(parts),
+                    model=self.model,
+                    timestamp=datetime.now(),
+                    metadata=self._response_metadata(data)
+                )
+                if cache_key is not None:
+                    self._cache_put(cache_key, result)
+                return result
+            
+            response = await self._aclient.post("/api/generate",
+                                              content=orjson.dumps(payload), headers=JSON_HEADERS)
             
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 
-                return LLMResponse(
+                result = LLMResponse(
                     text=data.get("response", ""),
                     model=self.model,
                     timestamp=datetime.now(),
-                    metadata={
-                        "total_duration": data.get("total_duration"),
-                        "load_duration": data.get("load_duration"),
-                        "prompt_eval_count": data.get("prompt_eval_count"),
-                        "eval_count": data.get("eval_count"),
-                        "eval_duration": data.get("eval_duration")
-                    }
+                    metadata=self._response_metadata(data)
                 )
+                if cache_key is not None:
+                    self._cache_put(cache_key, result)
+                return result
             else:
                 raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
                 
@@ -111,6 +246,29 @@ class OllamaClient:
             self.logger.error("LLM generation failed", error=str(e))
             raise
     
+    async def generate_stream(self,
+                              prompt: str,
+                              system_prompt: Optional[str] = None,
+                              temperature: float = 0.7,
+                              max_tokens: Optional[int] = None) -> AsyncIterator[str]:
+        """Generate a response from Ollama, yielding text as tokens arrive"""
+        
+        payload = self._build_generate_payload(prompt, system_prompt, temperature, max_tokens, True)
+        
+        try:
+            self.logger.info("Streaming response", 
+                           model=self.model, 
+                           prompt_length=len(prompt))
+            
+            async for data in self._iter_generate_chunks(payload):
+                text = data.get("response", "")
+                if text:
+                    yield text
+                    
+        except Exception as e:
+            self.logger.error("LLM streaming generation failed", error=str(e))
+            raise
+    
     async def chat(self, 
                    messages: List[Dict[str, str]], 
                    temperature: float = 0.7,
@@ -134,26 +292,17 @@ class OllamaClient:
                            model=self.model, 
                            message_count=len(messages))
             
-            response = requests.post(
-                f"{self.base_url}/api/chat",
-                json=payload,
-                timeout=self.timeout
-            )
+            response = await self._aclient.post("/api/chat",
+                                              content=orjson.dumps(payload), headers=JSON_HEADERS)
             
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 
                 return LLMResponse(
                     text=data.get("message", {}).get("content", ""),
                     model=self.model,
                     timestamp=datetime.now(),
-                    metadata={
-                        "total_duration": data.get("total_duration"),
-                        "load_duration": data.get("load_duration"),
-                        "prompt_eval_count": data.get("prompt_eval_count"),
-                        "eval_count": data.get("eval_count"),
-                        "eval_duration": data.get("eval_duration")
-                    }
+                    metadata=self._response_metadata(data)
                 )
             else:
                 raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
@@ -1,4 +1,13 @@
 # Real RiskAwareAgent with actual risk detection
+import asyncio
+import copy
+import functools
+import hashlib
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 from datetime import datetime
@@ -14,8 +23,63 @@ from app.mitigation.strategies import MitigationEngine
 
 logger = structlog.get_logger(__name__)
 
+# Request ids are UUID-shaped: a random per-process prefix plus a counter, so
+# minting one needs no os.urandom call. Forked workers draw a fresh prefix.
+def _reset_request_ids():
+    """Draw a new random prefix and restart the counter"""
+    global _request_id_prefix, _request_id_counter
+    _request_id_prefix = int.from_bytes(os.urandom(8), "big") << 64
+    _request_id_counter = itertools.count()
+
+def _next_request_id() -> str:
+    """Return a unique UUID-formatted request id"""
+    return str(uuid.UUID(int=_request_id_prefix | next(_request_id_counter), version=4))
+
+_reset_request_ids()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_request_ids)
+
+# Texts shorter than this (after stripping) cannot carry a meaningful risk signal
+MIN_RISK_TEXT_LENGTH = 4
+
+# Seconds a successful Ollama health check is reused by chat()
+OLLAMA_HEALTH_TTL = 5.0
+
+# PII types that count as significant on their own
+_HIGH_RISK_PII = frozenset({"ssn", "credit_card", "bank_account", "passport"})
+
+# Fixed replies produced by the agent itself rather than the LLM
+_PII_REPLY = "I understand you've shared some personal information with me. For your privacy and security, I'd prefer not to repeat or store personal details like names, addresses, or other identifying information. Is there something else I can help you with instead?"
+_PROCESS_ERROR_REPLY = "I apologize, but I'm having trouble processing your request right now."
+_PROCESS_OFFLINE_REPLY = "I'm currently offline. Please make sure the language model is available."
+_CHAT_CONNECT_REPLY = "I apologize, but I'm having trouble connecting to the language model."
+_CHAT_OFFLINE_REPLY = "I'm currently offline. Please make sure Ollama is running with 'ollama serve' in your terminal."
+_CHAT_EMPTY_REPLY = "I received an empty response. Please try again."
+_CHAT_NO_CLIENT_REPLY = "Ollama client is not initialized. Please check the system configuration."
+
+# Disclaimers wrapped around the LLM text by the bias and hallucination mitigations
+_BIAS_SUFFIX = "\n\n[Note: I strive to provide balanced, unbiased information. Please consider multiple perspectives on complex topics.]"
+_HALL_PREFIX = "I want to be transparent that I'm not entirely certain about this information: "
+_HALL_SUFFIX = "\n\nPlease verify this information from reliable sources."
+
+# Output risk analysis is skipped for these; they are known to be benign
+_CANNED_REPLIES = frozenset({
+    _PII_REPLY,
+    _PROCESS_ERROR_REPLY,
+    _PROCESS_OFFLINE_REPLY,
+    _CHAT_CONNECT_REPLY,
+    _CHAT_OFFLINE_REPLY,
+    _CHAT_EMPTY_REPLY,
+    _CHAT_NO_CLIENT_REPLY,
+})
+
+# Explicit __slots__ rather than dataclass(slots=True), which needs Python 3.10;
+# the README supports 3.8+
 @dataclass
 class RiskAnalysisResult:
+    __slots__ = ("input_risks", "output_risks", "overall_risk_score", "mitigations_applied",
+                 "processing_time", "request_id", "timestamp", "metadata")
+    
     input_risks: List[Dict[str, Any]]
     output_risks: List[Dict[str, Any]]
     overall_risk_score: Dict[str, Any]
@@ -27,6 +91,10 @@ class RiskAnalysisResult:
 
 @dataclass
 class AgentResponse:
+    __slots__ = ("final_text", "original_llm_response", "input_risks", "output_risks",
+                 "overall_risk_score", "mitigations_applied", "processing_time",
+                 "request_id", "timestamp", "metadata")
+    
     final_text: str
     original_llm_response: str
     input_risks: List
@@ -38,7 +106,49 @@ class AgentResponse:
     timestamp: datetime
     metadata: Dict[str, Any]
 
+def _score_risks(risks: List[Dict[str, Any]]) -> Tuple[float, float, str]:
+    """Return (max severity, mean confidence, risk level) over the risks in one pass"""
+    if not risks:
+        return 0.1, 0.9, "low"
+    
+    max_severity = risks[0]["severity"]
+    total_confidence = 0.0
+    for risk in risks:
+        severity = risk["severity"]
+        if severity > max_severity:
+            max_severity = severity
+        total_confidence += risk["confidence"]
+    
+    if max_severity >= 0.7:
+        risk_level = "high"
+    elif max_severity >= 0.4:
+        risk_level = "medium"
+    else:
+        risk_level = "low"
+    
+    return max_severity, total_confidence / len(risks), risk_level
+
 class RiskAwareAgent:
+    # Mitigation applied for each risk type produced by analyze_*_risks
+    _MITIGATIONS = {
+        "pii": "pii_privacy_protection",
+        "output_pii": "pii_privacy_protection",
+        "bias": "bias_disclaimer",
+        "output_bias": "bias_disclaimer",
+        "hallucination": "hallucination_disclaimer",
+    }
+    
+    # Lower wins when several mitigations apply
+    _MITIGATION_PRIORITY = {
+        "pii_privacy_protection": 0,
+        "hallucination_disclaimer": 1,
+        "bias_disclaimer": 2,
+    }
+    
+    # Components reported by health_check, in response order
+    _HEALTH_COMPONENTS = ("ollama", "bias_detector", "hallucination_detector", "pii_detector",
+                          "adversarial_detector", "risk_scorer", "mitigation_engine")
+    
     def __init__(self, ollama_client=None, config_file: str = "risk_config.json"):
         self.ollama_client = ollama_client
         
@@ -54,6 +164,15 @@ class RiskAwareAgent:
         self.risk_scorer = RiskScoringEngine()
         self.mitigation_engine = MitigationEngine()
         
+        # Detector results keyed by (detector, content digest); detectors are
+        # pure for a given configuration, so repeated prompts skip them
+        self.detector_cache_size = 4096
+        self._detector_cache: "OrderedDict[Tuple[str, bytes], Dict[str, Any]]" = OrderedDict()
+        self._detector_cache_lock = threading.Lock()
+        
+        # Monotonic deadline until which the last successful Ollama health check holds
+        self._health_ok_until = 0.0
+        
         logger.info("RiskAwareAgent initialized with enhanced configuration", 
                    global_sensitivity=config.global_sensitivity,
                    bias_threshold=config.bias_threshold,
@@ -81,55 +200,122 @@ class RiskAwareAgent:
         self.pii_detector.threshold = config.pii_threshold
         self.adversarial_detector.threshold = config.adversarial_threshold
         
+        # Cached results were computed under the old thresholds
+        with self._detector_cache_lock:
+            self._detector_cache.clear()
+        
+    async def _ping(self, component: str):
+        """Check a single component; raises if it is unhealthy"""
+        # No component exposes a liveness probe yet, so reaching here means healthy
+        return None
+    
     async def health_check(self):
-        return {
-            "ollama": True,
-            "bias_detector": True,
-            "hallucination_detector": True,
-            "pii_detector": True,
-            "adversarial_detector": True,
-            "risk_scorer": True,
-            "mitigation_engine": True,
-            "overall": True
-        }
+        # Components are pinged concurrently so real probes don't add up
+        results = await asyncio.gather(*(self._ping(component) for component in self._HEALTH_COMPONENTS),
+                                       return_exceptions=True)
+        status = {component: not isinstance(result, BaseException)
+                  for component, result in zip(self._HEALTH_COMPONENTS, results)}
+        status["overall"] = all(status.values())
+        return status
     
-    def analyze_input_risks(self, text: str) -> List[Dict[str, Any]]:
+    def _cached_detect(self, kind: str, detect, text: str, *args) -> Dict[str, Any]:
+        """
+        Call a detector, reusing the result for identical inputs.
+        
+        Results end up in the response as risk details, so the cache keeps its own
+        copy and hands out copies; callers may modify what they get back.
+        """
+        digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16)
+        for arg in args:
+            digest.update(b"\x00")
+            digest.update(repr(arg).encode("utf-8", "surrogatepass"))
+        key = (kind, digest.digest())
+        
+        with self._detector_cache_lock:
+            result = self._detector_cache.get(key)
+            if result is not None:
+                self._detector_cache.move_to_end(key)
+                return copy.deepcopy(result)
+        
+        result = detect(text, *args)
+        
+        # Detectors report a failure as a result whose details carry "error";
+        # the failure may be transient, so it is not cached
+        details = result.get("details") if isinstance(result, dict) else None
+        if isinstance(details, dict) and "error" in details:
+            return result
+        
+        with self._detector_cache_lock:
+            self._detector_cache[key] = copy.deepcopy(result)
+            while len(self._detector_cache) > self.detector_cache_size:
+                self._detector_cache.popitem(last=False)
+        return result
+    
+    async def _run_detectors(self, *calls: Tuple[Any, ...]) -> List[Any]:
+        """
+        Run synchronous detector calls concurrently in the default executor.
+        
+        Each call is a (function, *args) tuple. Results come back in call order;
+        a detector that raised yields its exception instead of a result.
+        """
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(
+            *(loop.run_in_executor(None, functools.partial(func, *args)) for func, *args in calls),
+            return_exceptions=True
+        )
+    
+    async def analyze_input_risks(self, text: str) -> List[Dict[str, Any]]:
         """Analyze input text for various risk types"""
         risks = []
         
-        # Run all detectors with enhanced sensitivity
-        try:
-            # Bias detection
-            bias_result = self.bias_detector.detect_bias(text)
-            logger.info("bias_detection_completed", 
-                       bias_score=bias_result.get("severity_score", 0.0), 
-                       detected=bias_result.get("detected", False))
+        if len(text.strip()) < MIN_RISK_TEXT_LENGTH:
+            return risks
+        
+        # Run all detectors concurrently with enhanced sensitivity
+        bias_result, pii_result, adv_result = await self._run_detectors(
+            (self._cached_detect, "bias", self.bias_detector.detect_bias, text),
+            (self._cached_detect, "pii", self.pii_detector.detect_pii, text),
+            # The adversarial detector keeps its own result cache
+            (self.adversarial_detector.detect_adversarial_input, text),
+        )
+        
+        # Bias detection
+        if isinstance(bias_result, Exception):
+            logger.error("Error in bias detection", error=str(bias_result))
+        else:
+            bias_score = bias_result.get("severity_score", 0.0)
+            bias_detected = bias_result.get("detected", False)
+            
+            logger.debug("bias_detection_completed", 
+                        bias_score=bias_score, 
+                        detected=bias_detected)
             
-            if bias_result.get("detected", False) or bias_result.get("severity_score", 0.0) > 0.2:
+            if bias_detected or bias_score > 0.2:
                 risks.append({
                     "type": "bias",
-                    "severity": bias_result.get("severity_score", 0.0),
+                    "severity": bias_score,
                     "confidence": bias_result.get("confidence", 0.0),
                     "details": bias_result
                 })
-            
-            # PII detection
-            pii_result = self.pii_detector.detect_pii(text)
-            logger.info("pii_detection_completed", 
-                       score=pii_result.get("severity_score", 0.0), 
-                       detected=pii_result.get("detected", False),
-                       pii_types=list(pii_result.get("details", {}).get("detected_pii", {}).keys()))
-            
+        
+        # PII detection
+        if isinstance(pii_result, Exception):
+            logger.error("Error in PII detection", error=str(pii_result))
+        else:
             # More sensitive PII detection - if any PII is found, consider it significant
             pii_detected = pii_result.get("detected", False)
             pii_score = pii_result.get("severity_score", 0.0)
             pii_types_found = pii_result.get("details", {}).get("detected_pii", {})
             
+            logger.debug("pii_detection_completed", 
+                        score=pii_score, 
+                        detected=pii_detected,
+                        pii_types=list(pii_types_found))
+            
             # If we found any PII types, boost the detection
             if pii_types_found and not pii_detected:
                 # Check if any high-risk PII was found
-                high_risk_found = any(pii_type in ["ssn", "credit_card", "bank_account", "passport"] 
-                                    for pii_type in pii_types_found.keys())
+                high_risk_found = not _HIGH_RISK_PII.isdisjoint(pii_types_found)
                 # Check if multiple PII types were found
                 multiple_pii = len(pii_types_found) > 1
                 
@@ -145,17 +331,19 @@ class RiskAwareAgent:
                     "confidence": pii_result.get("confidence", 0.0),
                     "details": pii_result
                 })
-            
-            # Adversarial detection
-            adv_result = self.adversarial_detector.detect_adversarial_input(text)
-            logger.info("adversarial_detection_completed", 
-                       score=adv_result.get("severity_score", 0.0), 
-                       detected=adv_result.get("detected", False))
-            
+        
+        # Adversarial detection
+        if isinstance(adv_result, Exception):
+            logger.error("Error in adversarial detection", error=str(adv_result))
+        else:
             # More sensitive adversarial detection
             adv_detected = adv_result.get("detected", False)
             adv_score = adv_result.get("severity_score", 0.0)
             
+            logger.debug("adversarial_detection_completed", 
+                        score=adv_score, 
+                        detected=adv_detected)
+            
             # Lower threshold for adversarial content due to security implications
             if adv_detected or adv_score > 0.25:
                 risks.append({
@@ -164,62 +352,76 @@ class RiskAwareAgent:
                     "confidence": adv_result.get("confidence", 0.0),
                     "details": adv_result
                 })
-                
-        except Exception as e:
-            logger.error("Error in risk analysis", error=str(e))
             
         return risks
     
-    def analyze_output_risks(self, text: str, input_text: str = "") -> List[Dict[str, Any]]:
+    async def analyze_output_risks(self, text: str, input_text: str = "") -> List[Dict[str, Any]]:
         """Analyze output text for hallucination and other risks"""
         risks = []
         
-        try:
-            # Hallucination detection
-            hall_result = self.hallucination_detector.detect_hallucination(text, {"input": input_text})
-            logger.info("hallucination_detection_completed", 
-                       score=hall_result.get("severity_score", 0.0), 
-                       detected=hall_result.get("detected", False))
+        if len(text.strip()) < MIN_RISK_TEXT_LENGTH or text in _CANNED_REPLIES:
+            return risks
+        
+        # Hallucination, bias and PII checks on the output are independent
+        hall_result, bias_result, pii_result = await self._run_detectors(
+            (self._cached_detect, "hallucination", self.hallucination_detector.detect_hallucination,
+             text, {"input": input_text}),
+            (self._cached_detect, "bias", self.bias_detector.detect_bias, text),
+            (self._cached_detect, "pii", self.pii_detector.detect_pii, text),
+        )
+        
+        # Hallucination detection
+        if isinstance(hall_result, Exception):
+            logger.error("Error in hallucination detection", error=str(hall_result))
+        else:
+            hall_score = hall_result.get("severity_score", 0.0)
+            hall_detected = hall_result.get("detected", False)
+            
+            logger.debug("hallucination_detection_completed", 
+                        score=hall_score, 
+                        detected=hall_detected)
             
-            if hall_result.get("detected", False) or hall_result.get("severity_score", 0.0) > 0.3:
+            if hall_detected or hall_score > 0.3:
                 risks.append({
                     "type": "hallucination",
-                    "severity": hall_result.get("severity_score", 0.0),
+                    "severity": hall_score,
                     "confidence": hall_result.get("confidence", 0.0),
                     "details": hall_result
                 })
-            
-            # Also check output for bias and PII
-            bias_result = self.bias_detector.detect_bias(text)
-            if bias_result.get("detected", False) or bias_result.get("severity_score", 0.0) > 0.2:
+        
+        # Also check output for bias and PII
+        if isinstance(bias_result, Exception):
+            logger.error("Error in output bias detection", error=str(bias_result))
+        else:
+            bias_score = bias_result.get("severity_score", 0.0)
+            if bias_result.get("detected", False) or bias_score > 0.2:
                 risks.append({
                     "type": "output_bias",
-                    "severity": bias_result.get("severity_score", 0.0),
+                    "severity": bias_score,
                     "confidence": bias_result.get("confidence", 0.0),
                     "details": bias_result
                 })
-            
-            pii_result = self.pii_detector.detect_pii(text)
-            if pii_result.get("detected", False) or pii_result.get("severity_score", 0.0) > 0.3:
+        
+        if isinstance(pii_result, Exception):
+            logger.error("Error in output PII detection", error=str(pii_result))
+        else:
+            pii_score = pii_result.get("severity_score", 0.0)
+            if pii_result.get("detected", False) or pii_score > 0.3:
                 risks.append({
                     "type": "output_pii",
-                    "severity": pii_result.get("severity_score", 0.0),
+                    "severity": pii_score,
                     "confidence": pii_result.get("confidence", 0.0),
                     "details": pii_result
                 })
-                
-        except Exception as e:
-            logger.error("Error in output risk analysis", error=str(e))
             
         return risks
         
     async def process(self, user_input: str, **kwargs):
         """Process user input with comprehensive risk analysis"""
-        import time
         start_time = time.time()
         
-        # Analyze input risks
-        input_risks = self.analyze_input_risks(user_input)
+        # Analyze input risks while the LLM generates; neither depends on the other
+        input_task = asyncio.ensure_future(self.analyze_input_risks(user_input))
         
         # Generate LLM response
         if self.ollama_client:
@@ -232,77 +434,20 @@ class RiskAwareAgent:
                 final_text = response.text
             except Exception as e:
                 logger.error("Error generating LLM response", error=str(e))
-                final_text = "I apologize, but I'm having trouble processing your request right now."
+                final_text = _PROCESS_ERROR_REPLY
         else:
-            final_text = "I'm currently offline. Please make sure the language model is available."
-        
-        # Analyze output risks
-        output_risks = self.analyze_output_risks(final_text, user_input)
+            final_text = _PROCESS_OFFLINE_REPLY
         
-        # Apply simple but effective mitigation
-        mitigated_text = final_text
-        mitigations_applied = []
-        
-        # Check for high-risk content that needs immediate mitigation
-        all_risks = input_risks + output_risks
-        for risk in all_risks:
-            risk_type = risk.get("type", "")
-            severity = risk.get("severity", 0)
-            
-            if severity >= 0.3:  # Medium/High risk threshold
-                if "pii" in risk_type.lower():
-                    # For PII risks, replace with privacy-safe response
-                    mitigated_text = "I understand you've shared some personal information with me. For your privacy and security, I'd prefer not to repeat or store personal details like names, addresses, or other identifying information. Is there something else I can help you with instead?"
-                    mitigations_applied.append("pii_privacy_protection")
-                    logger.info("Applied PII mitigation", severity=severity, risk_type=risk_type)
-                    break  # Exit after first mitigation
-                elif "bias" in risk_type.lower():
-                    mitigated_text = f"{final_text}\n\n[Note: I strive to provide balanced, unbiased information. Please consider multiple perspectives on complex topics.]"
-                    mitigations_applied.append("bias_disclaimer")
-                elif "hallucination" in risk_type.lower() and severity > 0.5:
-                    mitigated_text = f"I want to be transparent that I'm not entirely certain about this information: {final_text}\n\nPlease verify this information from reliable sources."
-                    mitigations_applied.append("hallucination_disclaimer")
-        
-        # Calculate overall risk score
-        if all_risks:
-            max_severity = max(risk["severity"] for risk in all_risks)
-            avg_confidence = sum(risk["confidence"] for risk in all_risks) / len(all_risks)
-            
-            if max_severity >= 0.7:
-                risk_level = "high"
-            elif max_severity >= 0.4:
-                risk_level = "medium"
-            else:
-                risk_level = "low"
-        else:
-            max_severity = 0.1
-            avg_confidence = 0.9
-            risk_level = "low"
-        
-        overall_risk_score = {
-            "overall_score": max_severity,
-            "risk_level": risk_level,
-            "confidence": avg_confidence
-        }
+        input_risks = await input_task
         
-        processing_time = time.time() - start_time
+        # Analyze output risks
+        output_risks = await self.analyze_output_risks(final_text, user_input)
         
-        return AgentResponse(
-            final_text=mitigated_text,  # Use mitigated text instead of original
-            original_llm_response=final_text,  # Keep original for comparison
-            input_risks=input_risks,
-            output_risks=output_risks,
-            overall_risk_score=overall_risk_score,
-            mitigations_applied=mitigations_applied,  # Include actual mitigations applied
-            processing_time=processing_time,
-            request_id=str(uuid.uuid4()),
-            timestamp=datetime.now(),
-            metadata={"input_text": user_input}
-        )
+        return self._finalize(final_text, input_risks, output_risks, start_time,
+                              {"input_text": user_input})
         
     async def chat(self, messages: List[Dict[str, str]], **kwargs):
         """Chat with comprehensive risk analysis"""
-        import time
         start_time = time.time()
         
         # Get the last user message
@@ -312,79 +457,93 @@ class RiskAwareAgent:
                 user_message = msg.get("content", "")
                 break
         
-        # Analyze input risks
-        input_risks = self.analyze_input_risks(user_message)
-        logger.info("Input risk analysis completed", 
-                   risks_detected=len(input_risks),
-                   user_message_preview=user_message[:50])
+        # Analyze input risks while the LLM generates; neither depends on the other
+        input_task = asyncio.ensure_future(self.analyze_input_risks(user_message))
         
         # Generate LLM response
-        final_text = "I apologize, but I'm having trouble connecting to the language model."
+        final_text = _CHAT_CONNECT_REPLY
         
         if self.ollama_client:
             try:
-                # First check if Ollama is healthy
-                is_healthy = self.ollama_client.health_check()
+                # First check if Ollama is healthy; a passing check is trusted for a few seconds
+                now = time.monotonic()
+                if now >= self._health_ok_until:
+                    self._health_ok_until = now + OLLAMA_HEALTH_TTL if self.ollama_client.health_check() else 0.0
+                is_healthy = self._health_ok_until > now
                 if not is_healthy:
-                    final_text = "I'm currently offline. Please make sure Ollama is running with 'ollama serve' in your terminal."
+                    final_text = _CHAT_OFFLINE_REPLY
                 else:
                     response = await self.ollama_client.chat(
                         messages=messages,
                         temperature=kwargs.get('temperature', 0.7),
                         max_tokens=kwargs.get('max_tokens', 500)
                     )
-                    final_text = response.text if response.text else "I received an empty response. Please try again."
+                    final_text = response.text if response.text else _CHAT_EMPTY_REPLY
                     
             except Exception as e:
                 logger.error("Error generating LLM response", error=str(e))
+                # Force a fresh health check on the next request
+                self._health_ok_until = 0.0
                 final_text = f"I encountered an error: {str(e)}. Please check if Ollama is running and the model is available."
         else:
-            final_text = "Ollama client is not initialized. Please check the system configuration."
+            final_text = _CHAT_NO_CLIENT_REPLY
+        
+        input_risks = await input_task
+        logger.info("Input risk analysis completed", 
+                   risks_detected=len(input_risks),
+                   user_message_preview=user_message[:50])
         
         # Analyze output risks
-        output_risks = self.analyze_output_risks(final_text, user_message)
+        output_risks = await self.analyze_output_risks(final_text, user_message)
         logger.info("Output risk analysis completed", 
                    risks_detected=len(output_risks))
         
+        return self._finalize(final_text, input_risks, output_risks, start_time,
+                              {"user_message": user_message})
+        
+    def _mitigation_for(self, risk: Dict[str, Any]) -> Optional[str]:
+        """Return the mitigation a risk calls for, or None if it is below threshold"""
+        severity = risk.get("severity", 0)
+        if severity < 0.3:  # Below Medium/High risk threshold
+            return None
+        
+        mitigation = self._MITIGATIONS.get(risk.get("type", ""))
+        if mitigation == "hallucination_disclaimer" and severity <= 0.5:
+            return None
+        return mitigation
+    
+    def _finalize(self, final_text: str, input_risks: List[Dict[str, Any]],
+                  output_risks: List[Dict[str, Any]], start_time: float,
+                  metadata: Dict[str, Any]) -> AgentResponse:
+        """Apply mitigations, score the combined risks and build the response"""
         # Apply simple but effective mitigation
         mitigated_text = final_text
         mitigations_applied = []
         
-        # Check for high-risk content that needs immediate mitigation
+        # Only the single highest-priority mitigation is applied
         all_risks = input_risks + output_risks
+        best = None
         for risk in all_risks:
-            risk_type = risk.get("type", "")
-            severity = risk.get("severity", 0)
-            
-            if severity >= 0.3:  # Medium/High risk threshold
-                if "pii" in risk_type.lower():
-                    # For PII risks, replace with privacy-safe response
-                    mitigated_text = "I understand you've shared some personal information with me. For your privacy and security, I'd prefer not to repeat or store personal details like names, addresses, or other identifying information. Is there something else I can help you with instead?"
-                    mitigations_applied.append("pii_privacy_protection")
-                    logger.info("Applied PII mitigation", severity=severity, risk_type=risk_type)
-                    break  # Exit after first mitigation
-                elif "bias" in risk_type.lower():
-                    mitigated_text = f"{final_text}\n\n[Note: I strive to provide balanced, unbiased information. Please consider multiple perspectives on complex topics.]"
-                    mitigations_applied.append("bias_disclaimer")
-                elif "hallucination" in risk_type.lower() and severity > 0.5:
-                    mitigated_text = f"I want to be transparent that I'm not entirely certain about this information: {final_text}\n\nPlease verify this information from reliable sources."
-                    mitigations_applied.append("hallucination_disclaimer")
-        
-        # Calculate overall risk score
-        if all_risks:
-            max_severity = max(risk["severity"] for risk in all_risks)
-            avg_confidence = sum(risk["confidence"] for risk in all_risks) / len(all_risks)
-            
-            if max_severity >= 0.7:
-                risk_level = "high"
-            elif max_severity >= 0.4:
-                risk_level = "medium"
+            mitigation = self._mitigation_for(risk)
+            if mitigation is None:
+                continue
+            priority = self._MITIGATION_PRIORITY[mitigation]
+            if best is None or priority < best[0]:
+                best = (priority, mitigation, risk)
+        
+        if best is not None:
+            _, mitigation, risk = best
+            if mitigation == "pii_privacy_protection":
+                # For PII risks, replace with privacy-safe response
+                mitigated_text = _PII_REPLY
+                logger.info("Applied PII mitigation", severity=risk["severity"], risk_type=risk["type"])
+            elif mitigation == "hallucination_disclaimer":
+                mitigated_text = _HALL_PREFIX + final_text + _HALL_SUFFIX
             else:
-                risk_level = "low"
-        else:
-            max_severity = 0.1
-            avg_confidence = 0.9
-            risk_level = "low"
+                mitigated_text = final_text + _BIAS_SUFFIX
+            mitigations_applied.append(mitigation)
+        
+        max_severity, avg_confidence, risk_level = _score_risks(all_risks)
         
         overall_risk_score = {
             "overall_score": max_severity,
@@ -399,7 +558,7 @@ class RiskAwareAgent:
                    risk_level=risk_level,
                    input_risks=len(input_risks),
                    output_risks=len(output_risks))
-            
+        
         return AgentResponse(
             final_text=mitigated_text,  # Use mitigated text
             original_llm_response=final_text,  # Keep original for comparison
@@ -408,9 +567,9 @@ class RiskAwareAgent:
             overall_risk_score=overall_risk_score,
             mitigations_applied=mitigations_applied,  # Include actual mitigations
             processing_time=processing_time,
-            request_id=str(uuid.uuid4()),
-            timestamp=datetime.now(),
-            metadata={"user_message": user_message}
+            request_id=_next_request_id(),
+            timestamp=datetime.fromtimestamp(start_time),
+            metadata=metadata
         )
         
     async def _analyze_input(self, text: str):
@@ -0,0 +1,38 @@
+"""
+Tests for the pure-ASGI middleware
+"""
+import asyncio
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core.middleware import ReadinessGate
+
+async def ok(request):
+    return PlainTextResponse("ok")
+
+def make_client(ready: asyncio.Event):
+    app = Starlette(
+        routes=[Route("/api/items", ok), Route("/admin/static/app.js", ok)],
+        middleware=[Middleware(ReadinessGate, event="db_ready", prefixes=("/api/", "/admin"),
+                               exclude_prefixes=("/admin/static",), timeout=0.05)],
+    )
+    app.state.db_ready = ready
+    return TestClient(app)
+
+def test_gate_times_out_with_503():
+    client = make_client(asyncio.Event())
+    response = client.get("/api/items")
+    assert response.status_code == 503
+    assert response.text == "Service Unavailable"
+
+def test_gate_passes_once_ready():
+    ready = asyncio.Event()
+    ready.set()
+    assert make_client(ready).get("/api/items").text == "ok"
+
+def test_excluded_prefix_never_waits():
+    assert make_client(asyncio.Event()).get("/admin/static/app.js").text == "ok"
@@ -0,0 +1,56 @@
+"""
+Tests for the in-memory static file server
+"""
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from app.core.static import PreloadedStaticFiles
+
+def make_client(directory):
+    app = Starlette(
+        routes=[Mount("/static", PreloadedStaticFiles(directory=str(directory)), name="static")],
+        middleware=[Middleware(GZipMiddleware, minimum_size=16)],
+    )
+    return TestClient(app)
+
+def test_same_asset_with_and_without_gzip(tmp_path):
+    body = b"body { color: red; }\n" * 100
+    (tmp_path / "site.css").write_bytes(body)
+    client = make_client(tmp_path)
+    
+    compressed = client.get("/static/site.css", headers={"accept-encoding": "gzip"})
+    assert compressed.status_code == 200
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.content == body
+    
+    # The cached headers must not keep the first response's encoding
+    plain = client.get("/static/site.css", headers={"accept-encoding": "identity"})
+    assert plain.status_code == 200
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["content-length"] == str(len(body))
+    assert plain.content == body
+    
+    again = client.get("/static/site.css", headers={"accept-encoding": "gzip"})
+    assert again.headers["content-encoding"] == "gzip"
+    assert again.content == body
+
+def test_etag_revalidation(tmp_path):
+    (tmp_path / "app.js").write_bytes(b"console.log('hi');\n")
+    client = make_client(tmp_path)
+    
+    first = client.get("/static/app.js")
+    assert first.status_code == 200
+    
+    cached = client.get("/static/app.js", headers={"if-none-match": first.headers["etag"]})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == first.headers["etag"]
+
+def test_missing_file_and_method(tmp_path):
+    (tmp_path / "a.txt").write_bytes(b"a")
+    client = make_client(tmp_path)
+    
+    assert client.get("/static/missing.txt").status_code == 404
+    assert client.post("/static/a.txt").status_code == 405